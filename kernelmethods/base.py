@@ -52,11 +52,171 @@ class BaseKernelFunction(ABC):
         self.name = name
 
 
+    # parameters from which the kernel derives constants (e.g. to choose a faster
+    #   method of evaluation), which are derived again whenever changed
+    _params = ()
+
+
+    def __setattr__(self, name, value):
+        """Sets the attribute, deriving constants again for any parameter"""
+
+        super().__setattr__(name, value)
+        # waiting until all of them are set initially in the constructor
+        if name in self._params and \
+            all(hasattr(self, param) for param in self._params):
+            self._bind_params()
+
+
+    def _bind_params(self):
+        """
+        Derives constants from the parameters of the kernel, named in _params.
+
+        Called whenever any of those parameters is set, keeping the constants
+        consistent with them. There is nothing to derive by default.
+        """
+
+
     @abstractmethod
     def __call__(self, x, y):
         """Actual computation to defined in the inherited class!"""
 
 
+    def _check_sample(self, sample):
+        """
+        Validates a 2D sample (samples in rows) once, such that the kernel can be
+        evaluated on any pair of its rows via _eval(), without checking each pair.
+
+        By default, sample is returned as is, and validation happens in each call.
+        """
+
+        return sample
+
+
+    def _eval(self, x, y):
+        """
+        Kernel value between inputs validated already e.g. rows of a sample
+        validated via _check_sample(). Same as a regular call by default.
+
+        Kernels may instead assign a plain function of (x, y) to this attribute,
+        with their parameters already bound to it, avoiding their lookup (and the
+        method dispatch) in every evaluation.
+        """
+
+        return self(x, y)
+
+
+    def eval_pairs(self, X, Y):
+        """
+        Evaluates the kernel on all pairs of rows (samples) from X and Y.
+
+        This default implementation simply loops over all the pairs. Derived
+        kernels are encouraged to override it with a vectorized implementation,
+        as this is the path used to compute the full kernel matrix or blocks of it.
+        Calling the kernel on a single pair of samples is meant for occasional use,
+        as it incurs the overhead of a python call (and input checks) per pair.
+
+        Parameters
+        ----------
+        X : ndarray
+            2D sample of shape (num_samples_one, num_features)
+
+        Y : ndarray
+            2D sample of shape (num_samples_two, num_features)
+            When Y is X, only half the matrix is computed, as it is symmetric.
+
+        Returns
+        -------
+        KM : ndarray
+            Matrix of shape (num_samples_one, num_samples_two), whose element [i, j]
+            is the kernel value between X[i, :] and Y[j, :]
+
+        """
+
+        # preserving the identity of Y when it refers to X (single sample case)
+        same_sample = Y is X
+        if not issparse(X):
+            X = np.asarray(X)
+        if same_sample:
+            Y = X
+        elif not issparse(Y):
+            Y = np.asarray(Y)
+
+        return self._eval_pairs_loop(X, Y, self)
+
+
+    @staticmethod
+    def _eval_pairs_loop(X, Y, kernel_func):
+        """Evaluates kernel_func on each pair of rows in X and Y, one at a time."""
+
+        num_x, num_y = X.shape[0], Y.shape[0]
+        KM = np.empty((num_x, num_y), dtype=cfg.km_dtype)
+        if Y is X:
+            for ix in range(num_x):
+                for iy in range(ix, num_y):
+                    KM[ix, iy] = KM[iy, ix] = kernel_func(X[ix, :], Y[iy, :])
+        else:
+            for ix, iy in iter_product(range(num_x), range(num_y)):
+                KM[ix, iy] = kernel_func(X[ix, :], Y[iy, :])
+
+        return KM
+
+
+    def eval_pairs_parallel(self, X, Y, n_jobs=None):
+        """
+        Same as eval_pairs, with blocks of rows of X evaluated in parallel threads.
+
+        Threads suffice (no copies of data), as the numerical work in numpy and
+        scipy releases the GIL. Each block is written directly into the
+        preallocated kernel matrix. This requires joblib to be installed.
+
+        Parameters
+        ----------
+        X : ndarray
+            2D sample of shape (num_samples_one, num_features)
+
+        Y : ndarray
+            2D sample of shape (num_samples_two, num_features)
+
+        n_jobs : int or None
+            Number of threads to use, following the joblib convention:
+            None means 1 (unless in a joblib.parallel_backend context),
+            and -1 means using all the CPUs.
+
+        Returns
+        -------
+        KM : ndarray
+            Matrix of shape (num_samples_one, num_samples_two), whose element [i, j]
+            is the kernel value between X[i, :] and Y[j, :]
+
+        """
+
+        # optional dependency, needed only here
+        from joblib import Parallel, delayed, effective_n_jobs
+
+        if not issparse(X):
+            X = np.asarray(X)
+        if not issparse(Y):
+            Y = np.asarray(Y)
+
+        num_blocks = min(effective_n_jobs(n_jobs), X.shape[0])
+        if num_blocks <= 1:
+            return self.eval_pairs(X, Y)
+
+        # evaluating on zero rows to obtain the dtype of the output
+        KM = np.empty((X.shape[0], Y.shape[0]),
+                      dtype=self.eval_pairs(X[:0], Y).dtype)
+
+        def eval_block(start, stop):
+            KM[start:stop] = self.eval_pairs(X[start:stop], Y)
+
+        boundaries = np.linspace(0, X.shape[0], num_blocks + 1).astype(int)
+        Parallel(n_jobs=num_blocks, backend='threading')(
+            delayed(eval_block)(start, stop)
+            for start, stop in zip(boundaries[:-1], boundaries[1:]))
+
+        return KM
+
+
     def is_psd(self):
         """Tests whether kernel matrix produced via this function is PSD"""
 
@@ -249,6 +409,8 @@ class KernelMatrix(object):
         """
 
         self._sample = ensure_ndarray_2D(sample_one, ensure_dtype=sample_one.dtype)
+        # validating once here, as required by the kernel, to skip it for each pair
+        self._sample = self.kernel._check_sample(self._sample)
         self._sample_name = name_one
 
         if sample_two is None:
@@ -265,6 +427,7 @@ class KernelMatrix(object):
         else:
             self._sample_two = ensure_ndarray_2D(sample_two,
                                                  ensure_dtype=sample_two.dtype)
+            self._sample_two = self.kernel._check_sample(self._sample_two)
 
             if self._sample.shape[1] != self._sample_two.shape[1]:
                 raise ValueError('Dimensionalities of the two samples differ!')
@@ -373,7 +536,9 @@ class KernelMatrix(object):
         # debugging and efficiency measurement purposes
         # for a given sample (of size n),
         #   number of kernel evals must never be more than n+ n*(n-1)/2 (or n(n+1)/2)
-        #   regardless of the number of times different forms of KM are accessed!
+        #   regardless of the number of times different forms of KM are accessed,
+        #   plus those of any sub matrices accessed before the full KM, whose
+        #   values are evaluated again in the single batch computing the full KM
         self._num_ker_eval = 0
 
 
@@ -571,9 +736,10 @@ class KernelMatrix(object):
         #  idx_one, idx_two = min(idx_one, idx_two), max(idx_one, idx_two)
 
         if not (idx_one, idx_two) in self._KM:
+            # samples were validated upon attach, no need to check again
             self._KM[(idx_one, idx_two)] = \
-                self.kernel(self._sample[idx_one, :],  # from 1st sample
-                            self._sample_two[idx_two, :])  # from 2nd sample
+                self.kernel._eval(self._sample[idx_one, :],  # from 1st sample
+                                  self._sample_two[idx_two, :])  # from 2nd sample
             # second refers to the first in the default case!
             self._num_ker_eval += 1
 
@@ -687,8 +853,37 @@ class KernelMatrix(object):
         Computes value of kernel matrix for all combinations of given set of indices
         """
 
-        return np.array([self._eval_kernel(idx_one, idx_two)
-                         for idx_one, idx_two in iter_product(set_one, set_two)],
+        # keys of all the pairs in the cache, with indices swapped to the
+        #   upper triangle for a single sample, to match _eval_kernel()
+        if self._two_samples:
+            keys = list(iter_product(set_one, set_two))
+        else:
+            keys = [(idx_one, idx_two) if idx_one <= idx_two else (idx_two, idx_one)
+                    for idx_one, idx_two in iter_product(set_one, set_two)]
+
+        if not self._populated_fully:
+            missing = set(key for key in keys if key not in self._KM)
+            if missing:
+                # evaluating only the rows and columns with some missing pairs,
+                #   in a single batch call, instead of one kernel call per pair
+                rows = sorted(set(idx_one for idx_one, _ in missing))
+                cols = sorted(set(idx_two for _, idx_two in missing))
+                sub_sample_one = self._sample[rows, :]
+                if not self._two_samples and rows == cols:
+                    sub_sample_two = sub_sample_one
+                else:
+                    sub_sample_two = self._sample_two[cols, :]
+                block = np.asarray(self.kernel.eval_pairs(sub_sample_one,
+                                                          sub_sample_two),
+                                   dtype=cfg.km_dtype)
+                for key, value in zip(iter_product(rows, cols),
+                                      block.ravel().tolist()):
+                    if key in missing:
+                        self._KM[key] = value
+                self._num_ker_eval += len(missing)
+
+        # all the pairs are in the cache by now
+        return np.array([self._KM[key] for key in keys],
                         dtype=self._sample.dtype).reshape(len(set_one), len(set_two))
 
 
@@ -706,28 +901,41 @@ class KernelMatrix(object):
         # as we are computing the full matrix anyways, it's better to keep a copy
         #   to avoid recomputing it for each access of self.full* attributes
         if not self._populated_fully and not hasattr(self, '_full_km'):
-            if not dense_fmt:
-                self._full_km = lil_matrix(self.shape, dtype=cfg.km_dtype)
-            else:
-                # filling with nan to avoid unexpected usage!
-                self._full_km = np.full(self.shape, fill_value=np.nan,
-                                        dtype=cfg.km_dtype)
-
             try:
-                # kernel matrix is symmetric (in a single sample case)
-                #   so we need only compute half the matrix!
-                # computing the kernel for diagonal elements i,i as well
-                #   as ix_two, even when equal to ix_one,
-                #   refers to sample_two in the two_samples case
-                for ix_one in range(self.shape[0]): # number of rows!
-                    for ix_two in range(ix_one, self.shape[1]): # from second sample!
-                        self._full_km[ix_one, ix_two] = \
-                            self._eval_kernel(ix_one, ix_two)
+                # evaluating the kernel on all pairs in a single batch call,
+                #   instead of looping over pairs here (one call per element)
+                # sample_two refers to the first sample in the single sample case,
+                #   allowing the kernel to exploit the symmetry of the matrix
+                km_values = np.asarray(self.kernel.eval_pairs(self._sample,
+                                                              self._sample_two),
+                                       dtype=cfg.km_dtype)
             except:
                 raise RuntimeError('Unable to fully compute the kernel matrix!')
             else:
                 self._populated_fully = True
 
+            # caching individual values to serve later element-wise access
+            #   maintaining only the upper triangular part, for a single sample
+            if self._two_samples:
+                ix_computed = np.indices(self.shape).reshape(2, -1)
+            else:
+                ix_computed = np.triu_indices(self.shape[0], m=self.shape[1])
+            self._KM.update(zip(zip(*(ix.tolist() for ix in ix_computed)),
+                                km_values[tuple(ix_computed)].tolist()))
+            # counting the pairs evaluated in the batch, including those cached
+            #   already from previous access, as they are evaluated again
+            self._num_ker_eval += len(ix_computed[0])
+
+            if fill_lower_tri:
+                self._lower_tri_km_filled = True
+            else:
+                km_values = np.triu(km_values)
+
+            if not dense_fmt:
+                self._full_km = lil_matrix(km_values, dtype=cfg.km_dtype)
+            else:
+                self._full_km = km_values
+
         if fill_lower_tri and not self._lower_tri_km_filled:
             try:
                 # choosing k=-1 as main diag is already covered above (nested for
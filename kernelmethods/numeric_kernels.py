@@ -1,14 +1,333 @@
+import math
+from functools import partial
+
 import numpy as np
 from kernelmethods.base import BaseKernelFunction
 from kernelmethods.config import Chi2NegativeValuesException
-from kernelmethods.utils import _ensure_min_eps, check_input_arrays
+from kernelmethods.utils import (_ensure_min_eps, check_input_arrays,
+                                 check_input_matrices)
+from scipy.sparse import issparse
+from scipy.spatial.distance import cdist, pdist, squareform
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# below this number of features, distances are computed directly via cdist,
+#   as matrix products (BLAS) pay off only for larger dimensionalities
+_max_dim_cdist = 16
+
+# number of rows of the kernel matrix computed at a time, small enough for the
+#   block to stay in cache between computing the distances and the exp
+_block_num_rows = 64
+
+# TODO special handling for sparse arrays in the remaining kernels
+#   inner product based kernels (and Gaussian) already exploit sparsity in batch
+
+if numba is not None:
+    # compiled loops fusing the difference, abs/square and sum, without
+    #   allocating any temporary arrays. Used only when numba is available.
+
+    @numba.njit(cache=True, fastmath=True)
+    def _laplacian_pair(x, y, neg_gamma):
+        """Laplacian kernel between two 1D arrays"""
+
+        dist = 0.0
+        for ix in range(x.size):
+            dist += abs(x[ix] - y[ix])
+
+        return math.exp(neg_gamma * dist)
+
+
+    @numba.njit(cache=True, fastmath=True)
+    def _gaussian_pair(x, y, neg_gamma):
+        """Gaussian kernel between two 1D arrays"""
+
+        dist = 0.0
+        for ix in range(x.size):
+            dist += (x[ix] - y[ix]) ** 2
+
+        return math.exp(neg_gamma * dist)
+
+
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def _laplacian_gram(X, Y, neg_gamma, KM, symmetric):
+        """
+        Laplacian kernel matrix between two 2D samples into KM, rows in parallel.
+
+        When symmetric (Y is X), only the upper triangle is computed and mirrored.
+        """
+
+        for ix in numba.prange(X.shape[0]):
+            for iy in range(ix if symmetric else 0, Y.shape[0]):
+                dist = 0.0
+                for jx in range(X.shape[1]):
+                    dist += abs(X[ix, jx] - Y[iy, jx])
+                KM[ix, iy] = math.exp(neg_gamma * dist)
+                if symmetric:
+                    KM[iy, ix] = KM[ix, iy]
+
+        return KM
+
+else:
+    # equivalents in numpy, with the same signature
+
+    def _laplacian_pair(x, y, neg_gamma):
+        """Laplacian kernel between two 1D arrays"""
+
+        # L1 norm sums the absolute differences in one call
+        #   math.exp on the resulting scalar skips the ufunc dispatch of np.exp
+        diff = np.subtract(x, y)
+        return math.exp(neg_gamma * np.linalg.norm(diff, ord=1))
+
+
+    def _gaussian_pair(x, y, neg_gamma):
+        """Gaussian kernel between two 1D arrays"""
+
+        # squared norm via dot product: avoids the sqrt and squaring in norm()**2
+        diff = np.subtract(x, y)
+        return math.exp(neg_gamma * diff.dot(diff))
+
+
+def _hadamard_pair(x, y, alpha):
+    """Hadamard kernel between two 1D arrays"""
+
+    abs_x_a = np.power(np.abs(x), alpha)
+    abs_y_a = np.power(np.abs(y), alpha)
+
+    return np.dot((abs_x_a * abs_y_a), 2 * (abs_x_a + abs_y_a))
+
+
+def _poly_pair(x, y, gamma, b, degree):
+    """Polynomial kernel between two 1D arrays"""
+
+    # sparse inputs (allowed only when skipping checks) are 2D (rows)
+    if issparse(x) or issparse(y):
+        inner_prod = _inner_products(x, y)
+    else:
+        inner_prod = np.dot(x, y)
+
+    return (b + gamma * inner_prod) ** degree
+
+
+def _chi2_pair(x, y, gamma):
+    """Chi-squared kernel between two 1D arrays"""
+
+    if (x < 0).any() or (y < 0).any():
+        raise Chi2NegativeValuesException(
+            'Chi^2 kernel requires non-negative values!'
+            ' x or y contains non-negative values')
+
+    # squaring by multiplication, which is exactly symmetric in x and y, unlike
+    #   np.power(x - y, 2) which may differ in the last bit from its reverse
+    diff = x - y
+    # Note: NaNs due to Zero division are being ignored via np.nansum!
+    #   math.exp on the resulting scalar skips the ufunc dispatch of np.exp
+    return math.exp(-gamma * np.nansum(diff * diff / (x + y)))
+
+
+def _sigmoid_pair(x, y, gamma, offset):
+    """Sigmoid kernel between two 1D arrays"""
+
+    # math.tanh on the resulting scalar skips the ufunc dispatch of np.tanh
+    return math.tanh(offset + gamma * np.dot(x, y))
+
+
+def _inner_products(X, Y, out=None):
+    """
+    Matrix of inner products between all pairs of rows in X and Y.
+
+    Always returned as a new dense floating point array (or in out, if given), so
+    it can be safely operated on in-place by the kernels to avoid allocating
+    further arrays of the same size. Sparse inputs are multiplied in sparse format
+    (cost proportional to the number of non-zeros), and only the result is
+    densified.
+
+    For X @ X.T (Y is X), numpy already calls the symmetric BLAS routine (syrk),
+    computing only half of the products, hence the identity of Y is retained.
+    """
+
+    dtype = _float_dtype(X, Y)
+    if not issparse(X) and X.dtype != dtype:
+        # integer products are not done in BLAS, and are much slower
+        same_sample = Y is X
+        X = X.astype(dtype)
+        if same_sample:
+            Y = X
+    if not issparse(Y) and Y.dtype != dtype:
+        Y = Y.astype(dtype)
+
+    if out is not None and not (issparse(X) or issparse(Y)):
+        return np.matmul(X, Y.T, out=out)
+
+    products = X @ Y.T
+    if issparse(products):
+        products = products.toarray()
+
+    if out is not None:
+        out[:] = products
+        return out
+
+    return np.asarray(products, dtype=dtype)
+
+
+def _float_dtype(X, Y):
+    """
+    Floating point dtype to compute the kernel matrix between X and Y in.
+
+    Precision of the inputs is retained (e.g. float32 inputs result in float32
+    kernel matrix, halving the memory traffic), with a minimum of float32.
+    Integer (or any other non-floating point) inputs result in float64.
+    """
+
+    if not (np.issubdtype(X.dtype, np.floating) and
+            np.issubdtype(Y.dtype, np.floating)):
+        return np.dtype(np.float64)
+
+    return np.result_type(X.dtype, Y.dtype, np.float32)
+
+
+def _as_float64(X, Y):
+    """Both samples (dense or sparse) in float64, retaining the identity of Y is X"""
+
+    same_sample = Y is X
+    X = X.astype(np.float64, copy=False)
+    Y = X if same_sample else Y.astype(np.float64, copy=False)
+
+    return X, Y
+
+
+def _row_sq_norms(X):
+    """Squared L2 norm of each row of X, dense or sparse"""
 
+    if issparse(X):
+        return np.asarray(X.multiply(X).sum(axis=1), dtype=np.float64).ravel()
 
-# TODO special handling for sparse arrays
-#   (e.g. custom dot product during kernel evaluation might be more efficient
+    # accumulating in floating point, as squares of integers can overflow
+    return np.einsum('ij,ij->i', X, X, dtype=_float_dtype(X, X))
+
+
+def _sq_distances_via_inner_products(X, Y, sq_norms_X, sq_norms_Y, out):
+    """
+    Squared euclidean distances between all pairs of rows in X and Y, into out.
+
+    Squared norms of the rows are precomputed by the caller, so they can be reused
+    across blocks of rows of X.
+    """
+
+    # ||x-y||^2 = ||x||^2 + ||y||^2 - 2 <x, y>, with the bulk of the work
+    #   in a single matrix product
+    _inner_products(X, Y, out=out)
+
+    return _sq_distances_from_inner_products(out, sq_norms_X, sq_norms_Y)
+
+
+def _sq_distances_from_inner_products(products, sq_norms_X, sq_norms_Y):
+    """
+    Squared euclidean distances from the inner products of rows in X and Y.
+
+    CAUTION: the products are overwritten by the distances, operating in-place to
+    avoid allocating more matrices of the same size!
+    """
+
+    np.multiply(products, -2, out=products)
+    np.add(products, sq_norms_X[:, np.newaxis], out=products)
+    np.add(products, sq_norms_Y[np.newaxis, :], out=products)
+    # round-off errors can make some of these distances slightly negative
+    np.maximum(products, 0, out=products)
+
+    return products
+
+
+def _row_blocks(num_rows, block_size=_block_num_rows):
+    """Slices over consecutive blocks of rows, to compute a kernel matrix in tiles"""
+
+    for start in range(0, num_rows, block_size):
+        yield slice(start, min(start + block_size, num_rows))
+
+
+def _int_pow(array, exponent):
+    """
+    Raises the array elementwise to a positive integer power via repeated squaring.
+
+    For small exponents, this needs only a handful of multiplications, which is
+    faster than the generic np.power. CAUTION: the input array is overwritten!
+    """
 
+    # common degrees need no copy of the input
+    if exponent == 1:
+        return array
+    if exponent == 2:
+        return np.multiply(array, array, out=array)
 
-class HadamardKernel(BaseKernelFunction):
+    result = array.copy()
+    exponent -= 1
+    while exponent > 0:
+        if exponent & 1:
+            np.multiply(result, array, out=result)
+        exponent >>= 1
+        if exponent > 0:
+            np.multiply(array, array, out=array)
+
+    return result
+
+
+class BaseNumericKernel(BaseKernelFunction):
+    """
+    Base class for the numeric kernel functions, validating their inputs.
+
+    Derived kernels must set the skip_input_checks flag, and may override the
+    dtype their inputs must be of, via the _input_dtype class attribute.
+    Vectorized kernels implement _eval_pairs(), which receives validated inputs.
+
+    """
+
+    _input_dtype = np.number
+
+
+    def _check_sample(self, sample):
+        """Validates a 2D sample once, to use _eval() on pairs of its rows"""
+
+        if not self.skip_input_checks:
+            sample, _ = check_input_matrices(sample, sample,
+                                             ensure_dtype=self._input_dtype)
+
+        return sample
+
+
+    def eval_pairs(self, X, Y):
+        """Evaluation of the kernel on all pairs of rows in X and Y"""
+
+        if not self.skip_input_checks:
+            X, Y = check_input_matrices(X, Y, ensure_dtype=self._input_dtype)
+
+        return self._eval_pairs(X, Y)
+
+
+    def _eval_pairs(self, X, Y):
+        """
+        Kernel matrix between samples X and Y, without any input validation.
+
+        This default loops over pairs, for kernels without a vectorized version.
+        """
+
+        symmetric = Y is X
+        # densifying, as the kernel funcs for a single pair take 1D arrays
+        if issparse(X):
+            X = X.toarray()
+        if issparse(Y):
+            Y = X if symmetric else Y.toarray()
+
+        return self._eval_pairs_loop(X, Y, self._eval)
+
+
+class HadamardKernel(BaseNumericKernel):
     """Hadamard kernel function
 
     Formula::
@@ -35,6 +354,9 @@ class HadamardKernel(BaseKernelFunction):
     """
 
 
+    _params = ('alpha', )
+
+
     def __init__(self, alpha=3, skip_input_checks=False):
         """
         Constructor
@@ -61,16 +383,19 @@ class HadamardKernel(BaseKernelFunction):
         self.skip_input_checks = skip_input_checks
 
 
+    def _bind_params(self):
+        """Derives constants from the parameters"""
+
+        self._eval = partial(_hadamard_pair, alpha=self.alpha)
+
+
     def __call__(self, x, y):
         """Actual implementation of kernel func"""
 
         if not self.skip_input_checks:
             x, y = check_input_arrays(x, y, ensure_dtype=np.number)
 
-        abs_x_a = np.power(np.abs(x), self.alpha)
-        abs_y_a = np.power(np.abs(y), self.alpha)
-
-        return np.dot((abs_x_a * abs_y_a), 2 * (abs_x_a + abs_y_a))
+        return self._eval(x, y)
 
 
     def __str__(self):
@@ -79,7 +404,7 @@ class HadamardKernel(BaseKernelFunction):
         return "{}(alpha={})".format(self.name, self.alpha)
 
 
-class PolyKernel(BaseKernelFunction):
+class PolyKernel(BaseNumericKernel):
     """Polynomial kernel function
 
     Formula::
@@ -103,6 +428,9 @@ class PolyKernel(BaseKernelFunction):
     """
 
 
+    _params = ('degree', 'gamma', 'b')
+
+
     def __init__(self, degree=3, gamma=1.0, b=1.0, skip_input_checks=False):
         """
         Constructor
@@ -132,13 +460,41 @@ class PolyKernel(BaseKernelFunction):
         self.skip_input_checks = skip_input_checks
 
 
+    def _bind_params(self):
+        """Derives constants from the parameters"""
+
+        # to use repeated squaring instead of np.power for integral degrees
+        self._is_int_degree = isinstance(self.degree, (int, np.integer)) and \
+                              self.degree >= 1
+        self._eval = partial(_poly_pair, gamma=self.gamma, b=self.b,
+                             degree=self.degree)
+
+
     def __call__(self, x, y):
         """Actual implementation of kernel func"""
 
         if not self.skip_input_checks:
             x, y = check_input_arrays(x, y, ensure_dtype=np.number)
 
-        return (self.b + self.gamma * np.dot(x, y)) ** self.degree
+        return self._eval(x, y)
+
+
+    def _eval_pairs(self, X, Y):
+        """Kernel matrix between samples X and Y, without any input validation"""
+
+        # operating in-place to avoid allocating more matrices of the same size
+        KM = _inner_products(X, Y)
+        # skipping the passes over KM that would leave it unchanged, e.g. the
+        #   linear kernel resulting from degree=1, b=0
+        # constants of the same dtype, to avoid upcasting (e.g. from float32)
+        if self.gamma != 1:
+            np.multiply(KM, KM.dtype.type(self.gamma), out=KM)
+        if self.b != 0:
+            np.add(KM, KM.dtype.type(self.b), out=KM)
+        if self._is_int_degree:
+            return _int_pow(KM, self.degree)
+        else:
+            return np.power(KM, self.degree, out=KM)
 
 
     def __str__(self):
@@ -148,7 +504,7 @@ class PolyKernel(BaseKernelFunction):
                                                     self.gamma, self.b)
 
 
-class GaussianKernel(BaseKernelFunction):
+class GaussianKernel(BaseNumericKernel):
     """Gaussian kernel function
 
     Parameters
@@ -164,6 +520,9 @@ class GaussianKernel(BaseKernelFunction):
     """
 
 
+    _params = ('gamma', )
+
+
     def __init__(self, sigma=2.0, skip_input_checks=False):
         """
         Constructor
@@ -190,13 +549,83 @@ class GaussianKernel(BaseKernelFunction):
         self.skip_input_checks = skip_input_checks
 
 
+    def _bind_params(self):
+        """Derives constants from the parameters"""
+
+        # negated once here, instead of in every evaluation
+        self._neg_gamma = np.float64(-self.gamma)
+        self._eval = partial(_gaussian_pair, neg_gamma=self._neg_gamma)
+
+
     def __call__(self, x, y):
         """Actual implementation of kernel func"""
 
         if not self.skip_input_checks:
             x, y = check_input_arrays(x, y, ensure_dtype=np.number)
 
-        return np.exp(-self.gamma * np.linalg.norm(x - y, ord=2) ** 2)
+        return self._eval(x, y)
+
+
+    def _eval_pairs(self, X, Y):
+        """Kernel matrix between samples X and Y, without any input validation"""
+
+        symmetric = Y is X
+        KM = np.empty((X.shape[0], Y.shape[0]), dtype=_float_dtype(X, Y))
+
+        # direct (and exact) computation of distances is faster in low dimensions
+        use_cdist = not (issparse(X) or issparse(Y)) and X.shape[1] < _max_dim_cdist
+        if not use_cdist:
+            # accumulating distances in float64 regardless of the precision of the
+            #   inputs, as the cancellation in ||x||^2 + ||y||^2 - 2 <x, y> leaves
+            #   few (if any) correct digits in float32 for points close to each other
+            X, Y = _as_float64(X, Y)
+            # computed once for all the rows, instead of for each block
+            sq_norms_X = _row_sq_norms(X)
+            sq_norms_Y = sq_norms_X if symmetric else _row_sq_norms(Y)
+            if symmetric:
+                # all the products at once, as numpy computes only half of them
+                #   (syrk) for X @ X.T, which is not possible for blocks of rows
+                products = _inner_products(X, X, out=KM if KM.dtype == np.float64
+                                                  else None)
+            elif KM.dtype != np.float64:
+                # distances of a block, reused for all the blocks
+                sq_dists_buffer = np.empty((min(_block_num_rows, X.shape[0]),
+                                            Y.shape[0]))
+
+        # one block of rows at a time: the exp is applied while the distances are
+        #   still in cache, instead of making two passes over the entire matrix
+        for rows in _row_blocks(X.shape[0]):
+            KM_block = KM[rows]
+            if use_cdist:
+                # cdist always returns float64
+                sq_dists = cdist(X[rows], Y, metric='sqeuclidean')
+            elif symmetric:
+                sq_dists = _sq_distances_from_inner_products(
+                    products[rows], sq_norms_X[rows], sq_norms_Y)
+            else:
+                if KM.dtype == np.float64:
+                    sq_dists = KM_block
+                else:
+                    sq_dists = sq_dists_buffer[:KM_block.shape[0]]
+                _sq_distances_via_inner_products(X[rows], Y, sq_norms_X[rows],
+                                                 sq_norms_Y, out=sq_dists)
+
+            # casting to the precision of the inputs only the result of the exp
+            if numexpr is not None:
+                # scaling and exp fused into a single (multi-threaded) pass
+                numexpr.evaluate('exp(neg_gamma * sq_dists)', out=KM_block,
+                                 casting='same_kind',
+                                 local_dict={'sq_dists' : sq_dists,
+                                             'neg_gamma': self._neg_gamma})
+            else:
+                np.multiply(sq_dists, self._neg_gamma, out=sq_dists)
+                np.exp(sq_dists, out=KM_block)
+
+        if symmetric:
+            # self-similarity is exactly 1, despite any round-off in distances
+            np.fill_diagonal(KM, 1)
+
+        return KM
 
 
     def __str__(self):
@@ -205,7 +634,7 @@ class GaussianKernel(BaseKernelFunction):
         return "{}(sigma={})".format(self.name, self.sigma)
 
 
-class LaplacianKernel(BaseKernelFunction):
+class LaplacianKernel(BaseNumericKernel):
     """Laplacian kernel function
 
     Parameters
@@ -221,6 +650,9 @@ class LaplacianKernel(BaseKernelFunction):
     """
 
 
+    _params = ('gamma', )
+
+
     def __init__(self, gamma=1.0, skip_input_checks=False):
         """
         Constructor
@@ -244,13 +676,71 @@ class LaplacianKernel(BaseKernelFunction):
         self.skip_input_checks = skip_input_checks
 
 
+    def _bind_params(self):
+        """Derives constants from the parameters"""
+
+        # negated once here, instead of in every evaluation
+        self._neg_gamma = np.float64(-self.gamma)
+        self._eval = partial(_laplacian_pair, neg_gamma=self._neg_gamma)
+
+
     def __call__(self, x, y):
         """Actual implementation of kernel func"""
 
         if not self.skip_input_checks:
             x, y = check_input_arrays(x, y, ensure_dtype=np.number)
 
-        return np.exp(-self.gamma * np.sum(np.abs(x - y)))
+        return self._eval(x, y)
+
+
+    def eval_pairs_parallel(self, X, Y, n_jobs=None):
+        """Same as eval_pairs, with blocks of rows evaluated in parallel threads"""
+
+        # compiled loop is already parallel over rows, and must not be
+        #   launched concurrently from multiple threads
+        if numba is not None:
+            return self.eval_pairs(X, Y)
+
+        return super().eval_pairs_parallel(X, Y, n_jobs=n_jobs)
+
+
+    def _eval_pairs(self, X, Y):
+        """Kernel matrix between samples X and Y, without any input validation"""
+
+        # kernel matrix is symmetric in the single sample case: computing each
+        #   distance only once, as it costs O(num_features) per pair
+        symmetric = Y is X
+        # densifying, as L1 distances can not be derived from inner products
+        if issparse(X):
+            X = X.toarray()
+        if issparse(Y):
+            Y = X if symmetric else Y.toarray()
+
+        if numba is not None:
+            # differences of unsigned integers would wrap around in compiled loop
+            dtype = _float_dtype(X, Y)
+            X = X.astype(dtype, copy=False)
+            Y = X if symmetric else Y.astype(dtype, copy=False)
+            KM = np.empty((X.shape[0], Y.shape[0]), dtype=dtype)
+            return _laplacian_gram(X, Y, self._neg_gamma, KM, symmetric)
+
+        if symmetric:
+            # scipy always returns float64: reverting to the precision of inputs
+            KM = squareform(pdist(X, metric='cityblock'))
+            KM = KM.astype(_float_dtype(X, Y), copy=False)
+            np.multiply(KM, KM.dtype.type(self._neg_gamma), out=KM)
+            return np.exp(KM, out=KM)
+
+        KM = np.empty((X.shape[0], Y.shape[0]), dtype=_float_dtype(X, Y))
+        neg_gamma = KM.dtype.type(self._neg_gamma)
+        # one block of rows at a time, applying exp while distances are in cache
+        for rows in _row_blocks(X.shape[0]):
+            KM_block = KM[rows]
+            KM_block[:] = cdist(X[rows], Y, metric='cityblock')
+            np.multiply(KM_block, neg_gamma, out=KM_block)
+            np.exp(KM_block, out=KM_block)
+
+        return KM
 
 
     def __str__(self):
@@ -259,7 +749,7 @@ class LaplacianKernel(BaseKernelFunction):
         return "{}(gamma={})".format(self.name, self.gamma)
 
 
-class Chi2Kernel(BaseKernelFunction):
+class Chi2Kernel(BaseNumericKernel):
     """Chi-squared kernel function
 
     This kernel is implemented as::
@@ -288,6 +778,11 @@ class Chi2Kernel(BaseKernelFunction):
     """
 
 
+    # division by (x + y) requires floating point inputs
+    _input_dtype = np.float64
+    _params = ('gamma', )
+
+
     def __init__(self, gamma=1.0, skip_input_checks=False):
         """
         Constructor
@@ -311,21 +806,19 @@ class Chi2Kernel(BaseKernelFunction):
         self.skip_input_checks = skip_input_checks
 
 
+    def _bind_params(self):
+        """Derives constants from the parameters"""
+
+        self._eval = partial(_chi2_pair, gamma=self.gamma)
+
+
     def __call__(self, x, y):
         """Actual implementation of kernel func"""
 
         if not self.skip_input_checks:
-            x, y = check_input_arrays(x, y, ensure_dtype=np.float64)
-
-        if (x < 0).any() or (y < 0).any():
-            raise Chi2NegativeValuesException(
-                'Chi^2 kernel requires non-negative values!'
-                ' x or y contains non-negative values')
+            x, y = check_input_arrays(x, y, ensure_dtype=self._input_dtype)
 
-        # Note: NaNs due to Zero division are being ignored via np.nansum!
-        value = np.exp(-self.gamma * np.nansum(np.power(x - y, 2) / (x + y)))
-
-        return value
+        return self._eval(x, y)
 
 
     def __str__(self):
@@ -334,7 +827,7 @@ class Chi2Kernel(BaseKernelFunction):
         return "{}(gamma={})".format(self.name, self.gamma)
 
 
-class SigmoidKernel(BaseKernelFunction):
+class SigmoidKernel(BaseNumericKernel):
     """
     Sigmoid kernel function (also known as hyperbolic tangent kernel)
 
@@ -357,6 +850,9 @@ class SigmoidKernel(BaseKernelFunction):
     """
 
 
+    _params = ('gamma', 'offset')
+
+
     def __init__(self, gamma=1.0, offset=1.0, skip_input_checks=False):
         """
         Constructor
@@ -384,13 +880,41 @@ class SigmoidKernel(BaseKernelFunction):
         self.skip_input_checks = skip_input_checks
 
 
+    def _bind_params(self):
+        """Derives constants from the parameters"""
+
+        # float64 copies, to avoid type promotion in every evaluation
+        self._gamma = np.float64(self.gamma)
+        self._offset = np.float64(self.offset)
+        self._eval = partial(_sigmoid_pair, gamma=self._gamma, offset=self._offset)
+
+
     def __call__(self, x, y):
         """Actual implementation of kernel func"""
 
         if not self.skip_input_checks:
             x, y = check_input_arrays(x, y, ensure_dtype=np.number)
 
-        return np.tanh(self.offset + (self.gamma * np.dot(x, y)))
+        return self._eval(x, y)
+
+
+    def _eval_pairs(self, X, Y):
+        """Kernel matrix between samples X and Y, without any input validation"""
+
+        # operating in-place to avoid allocating more matrices of the same size
+        KM = _inner_products(X, Y)
+        # constants of the same dtype, to avoid upcasting (e.g. from float32)
+        gamma, offset = KM.dtype.type(self._gamma), KM.dtype.type(self._offset)
+        if numexpr is not None:
+            # scaling, offset and tanh fused into a single (multi-threaded) pass
+            return numexpr.evaluate('tanh(offset + gamma * KM)', out=KM,
+                                    local_dict={'KM'    : KM,
+                                                'gamma' : gamma,
+                                                'offset': offset})
+
+        np.multiply(KM, gamma, out=KM)
+        np.add(KM, offset, out=KM)
+        return np.tanh(KM, out=KM)
 
 
     def __str__(self):
@@ -399,7 +923,7 @@ class SigmoidKernel(BaseKernelFunction):
         return "{}(gamma={},offset={})".format(self.name, self.gamma, self.offset)
 
 
-class LinearKernel(BaseKernelFunction):
+class LinearKernel(BaseNumericKernel):
     """Linear kernel function
 
     Parameters
@@ -434,7 +958,27 @@ class LinearKernel(BaseKernelFunction):
         if not self.skip_input_checks:
             x, y = check_input_arrays(x, y, ensure_dtype=np.number)
 
-        return x.dot(y.T)
+        return self._eval(x, y)
+
+
+    def _eval(self, x, y):
+        """Kernel value between inputs validated already"""
+
+        # sparse inputs (allowed only when skipping checks) are 2D (rows)
+        if issparse(x) or issparse(y):
+            return self._eval_pairs(x, y)
+
+        # single dot product (BLAS ddot) for the common case of 1D vectors
+        if x.ndim == 1 and y.ndim == 1:
+            return np.dot(x, y)
+
+        return x @ y.T
+
+
+    def _eval_pairs(self, X, Y):
+        """Kernel matrix between samples X and Y, without any input validation"""
+
+        return _inner_products(X, Y)
 
 
     def __str__(self):
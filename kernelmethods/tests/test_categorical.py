@@ -120,3 +120,16 @@ def test_match_count_kernel(sample_dim, num_samples, string_length, perc_flag):
     poly = MatchCountKernel(return_perc=perc_flag, skip_input_checks=False)
     _test_for_all_kernels(poly, sample_dim, string_length)
     _test_func_is_valid_kernel(poly, sample_dim, num_samples, string_length)
+
+
+def test_eval_pairs_on_lists():
+    """Batch evaluation must accept lists, and match the pairwise evaluation."""
+
+    X = gen_random_sample(7, default_feature_dim, range_string_length[0])
+    Y = gen_random_sample(4, default_feature_dim, range_string_length[0])
+    for kernel in SupportedKernels:
+        batch = kernel.eval_pairs(X.tolist(), Y.tolist())
+        pairwise = np.array([[kernel(x, y) for y in Y] for x in X])
+        if not np.allclose(batch, pairwise):
+            raise ValueError('{} batch evaluation differs from pairwise!'
+                             ''.format(kernel))
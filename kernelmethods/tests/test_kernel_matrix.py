@@ -127,6 +127,68 @@ def test_random_submatrix_access():
                                 subset_len2[1]-subset_len2[0]):
         raise ValueError('error in KM access implementation')
 
+def test_submatrix_access_matches_full():
+
+    km = KernelMatrix(poly, normalized=False)
+    km.attach_to(sample_data)
+    set_one = sorted(np.random.choice(num_samples, 7, replace=False))
+    set_two = sorted(np.random.choice(num_samples, 5, replace=False))
+    # computed in a batch, before the full KM is populated
+    for rows, cols in ((set_one, set_two), (set_one, set_one)):
+        sub_matrix = km[rows, cols]
+        if not np.allclose(sub_matrix, km.full[np.ix_(rows, cols)]):
+            raise ValueError('sub matrix differs from the corresponding block of '
+                             'the full kernel matrix')
+        km.attach_to(sample_data)  # reset
+
+    # the full KM is evaluated in a single batch, on top of the earlier access
+    _ = km[set_one, set_two]
+    num_ker_eval_sub_matrix = km._num_ker_eval
+    if not 0 < num_ker_eval_sub_matrix <= len(set_one) * len(set_two):
+        raise ValueError('unexpected value for counter _num_ker_eval after '
+                         'sub matrix access!')
+    _ = km.full
+    if km._num_ker_eval != num_ker_eval_sub_matrix + max_num_ker_eval:
+        raise ValueError('unexpected value for counter _num_ker_eval after '
+                         'full kernel matrix access!')
+
+
+def test_submatrix_access_uses_cache():
+
+    kernel = PolyKernel(degree=2)
+    batch_calls = list()
+
+    def counted_eval_pairs(X, Y, eval_pairs=kernel.eval_pairs):
+        batch_calls.append(len(X))
+        return eval_pairs(X, Y)
+
+    kernel.eval_pairs = counted_eval_pairs
+    km = KernelMatrix(kernel, normalized=False)
+    km.attach_to(sample_data)
+    set_one = sorted(np.random.choice(num_samples, 7, replace=False))
+    set_two = sorted(np.random.choice(num_samples, 5, replace=False))
+    _ = km[set_one, set_two]
+    # all these are cached already, including the transposed block
+    _ = km[set_one, set_two]
+    _ = km[set_two, set_one]
+    _ = km[set_one[0], set_two[0]]
+    if len(batch_calls) != 1:
+        raise ValueError('cached values were re-evaluated in sub matrix access!')
+
+
+def test_attach_validates_sample():
+
+    km = KernelMatrix(PolyKernel(degree=2), normalized=False)
+    # validated once upon attach, instead of each pair of samples later
+    with raises(ValueError):
+        km.attach_to(np.array([['a', 'b'], ['c', 'd']]))
+
+    km.attach_to(sample_data)
+    for ix_one, ix_two in np.random.randint(0, num_samples, (5, 2)):
+        external_eval = km.kernel(sample_data[ix_one, :], sample_data[ix_two, :])
+        if not np.isclose(km[ix_one, ix_two], external_eval):
+            raise ValueError('Element access does not match external evaluation!')
+
 def test_size_properties():
 
     if len(km1.diagonal()) != num_samples:
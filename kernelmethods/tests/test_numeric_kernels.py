@@ -3,8 +3,9 @@ from numbers import Number
 
 import numpy as np
 from hypothesis import (HealthCheck, given, settings as hyp_settings, strategies)
-from pytest import raises
+from pytest import importorskip, raises
 
+from kernelmethods import numeric_kernels
 from kernelmethods.base import KernelMatrix
 from kernelmethods.numeric_kernels import (Chi2Kernel, DEFINED_KERNEL_FUNCS,
                                            GaussianKernel, LaplacianKernel,
@@ -224,3 +225,222 @@ def test_Hadamard_kernel_misc():
     with raises(ValueError):
         had = HadamardKernel(alpha=0)
 
+
+
+def test_eval_pairs_matches_pairwise():
+    """Batch evaluation must match the kernel evaluated one pair at a time."""
+
+    # more samples than a single block of rows, in the symmetric case
+    num_samples_one, num_samples_two = 70, 15
+    X = gen_random_sample(num_samples_one, default_feature_dim)
+    Y = gen_random_sample(num_samples_two, default_feature_dim)
+
+    for kernel in DEFINED_KERNEL_FUNCS:
+        # lists of samples must be accepted as well
+        for sample_one, sample_two in ((X, Y), (X, X), (X.tolist(), Y.tolist())):
+            batch = kernel.eval_pairs(sample_one, sample_two)
+            if batch.shape != (len(sample_one), len(sample_two)):
+                raise ValueError('{} returned a batch of unexpected shape {}'
+                                 ''.format(kernel, batch.shape))
+
+            pairwise = np.array([[kernel(x, y) for y in sample_two]
+                                 for x in sample_one])
+            if not np.allclose(batch, pairwise):
+                raise ValueError('{} batch evaluation differs from pairwise!'
+                                 ''.format(kernel))
+
+    with raises(ValueError):
+        # number of features must match
+        PolyKernel().eval_pairs(X, Y[:, :-1])
+
+
+def test_polynomial_kernel_integer_degree():
+    """Integral degrees must match the generic power, for all common degrees."""
+
+    X = gen_random_sample(20, default_feature_dim)
+    for degree in range(1, range_polynomial_degree[1] + 1):
+        int_poly = PolyKernel(degree=degree, b=0.5)
+        float_poly = PolyKernel(degree=float(degree), b=0.5)
+        if not np.allclose(int_poly.eval_pairs(X, X), float_poly.eval_pairs(X, X)):
+            raise ValueError('{} differs from generic power for degree {}'
+                             ''.format(int_poly, degree))
+
+    # degree changed after construction must switch to the generic power
+    poly = PolyKernel(degree=2, b=0.5)
+    poly.degree = 2.5
+    if not np.allclose(poly.eval_pairs(X, X), PolyKernel(degree=2.5, b=0.5).eval_pairs(X, X)):
+        raise ValueError('{} did not apply the changed degree'.format(poly))
+
+
+def test_polynomial_kernel_reducing_to_linear():
+    """Degree 1 with no intercept must be the same as the linear kernel."""
+
+    X = gen_random_sample(20, default_feature_dim)
+    poly, linear = PolyKernel(degree=1, b=0), LinearKernel()
+    if not np.allclose(poly.eval_pairs(X, X), linear.eval_pairs(X, X)):
+        raise ValueError('{} differs from {}'.format(poly, linear))
+    if not np.isclose(poly(X[0, :], X[1, :]), linear(X[0, :], X[1, :])):
+        raise ValueError('{} differs from {} for a single pair'
+                         ''.format(poly, linear))
+
+
+def test_eval_pairs_sparse():
+    """Kernels must produce the same matrix for sparse and dense inputs."""
+
+    from scipy.sparse import random as sparse_random
+
+    X = sparse_random(20, default_feature_dim, density=0.2, format='csr')
+    Y = sparse_random(15, default_feature_dim, density=0.2, format='csc')
+
+    for kernel in (PolyKernel(), GaussianKernel(), LaplacianKernel(),
+                   LinearKernel(), SigmoidKernel(), Chi2Kernel(),
+                   HadamardKernel()):
+        for sample_one, sample_two in ((X, Y), (X, X), (X, Y.toarray())):
+            sparse_km = kernel.eval_pairs(sample_one, sample_two)
+            dense_two = sample_two.toarray() if hasattr(sample_two, 'toarray') \
+                else sample_two
+            dense_km = kernel.eval_pairs(sample_one.toarray(), dense_two)
+            if not np.allclose(sparse_km, dense_km):
+                raise ValueError('{} differs between sparse and dense inputs'
+                                 ''.format(kernel))
+
+
+def test_changed_params_apply():
+    """Changing a parameter after construction must change the evaluations."""
+
+    X = gen_random_sample(10, default_feature_dim)
+
+    # gamma of the Gaussian kernel is derived from sigma in the constructor
+    for changed, new_params, fresh in (
+        (GaussianKernel(), {'gamma': 0.5}, GaussianKernel(sigma=1.0)),
+        (LaplacianKernel(), {'gamma': 0.3}, LaplacianKernel(gamma=0.3)),
+        (SigmoidKernel(), {'gamma': 0.3, 'offset': 2.0},
+         SigmoidKernel(gamma=0.3, offset=2.0)),
+        (HadamardKernel(), {'alpha': 2}, HadamardKernel(alpha=2)),
+        (PolyKernel(), {'degree': 2, 'gamma': 0.5, 'b': 2.0},
+         PolyKernel(degree=2, gamma=0.5, b=2.0)),
+        (Chi2Kernel(), {'gamma': 0.3}, Chi2Kernel(gamma=0.3))):
+        for param, value in new_params.items():
+            setattr(changed, param, value)
+
+        if not np.allclose(changed.eval_pairs(X, X), fresh.eval_pairs(X, X)) or \
+            not np.isclose(changed(X[0], X[1]), fresh(X[0], X[1])):
+            raise ValueError('{} did not apply the changed parameters'
+                             ''.format(changed))
+
+
+def test_eval_pairs_retains_precision():
+    """Batch evaluation must not upcast float32 inputs."""
+
+    X = gen_random_sample(20, default_feature_dim).astype(np.float32)
+    Y = gen_random_sample(15, default_feature_dim).astype(np.float32)
+
+    for kernel in (PolyKernel(), GaussianKernel(), LaplacianKernel(),
+                   LinearKernel(), SigmoidKernel()):
+        km = kernel.eval_pairs(X, Y)
+        if km.dtype != np.float32:
+            raise TypeError('{} upcast float32 inputs to {}'.format(kernel, km.dtype))
+        if not np.allclose(km, kernel.eval_pairs(X.astype(np.float64),
+                                                 Y.astype(np.float64)),
+                           rtol=1e-4, atol=1e-5):
+            raise ValueError('{} differs between float32 and float64 inputs'
+                             ''.format(kernel))
+
+
+def test_gaussian_kernel_float32_far_from_origin():
+    """Distances between close float32 points must not be lost to cancellation."""
+
+    # far from the origin, the squared norms dwarf the distances between points
+    X = (1000 + gen_random_sample(20, 50)).astype(np.float32)
+    Y = (1000 + gen_random_sample(15, 50)).astype(np.float32)
+
+    kernel = GaussianKernel()
+    for sample_one, sample_two in ((X, Y), (X, X)):
+        km = kernel.eval_pairs(sample_one, sample_two)
+        if km.dtype != np.float32:
+            raise TypeError('{} upcast float32 inputs to {}'.format(kernel, km.dtype))
+        if not np.allclose(km, kernel.eval_pairs(sample_one.astype(np.float64),
+                                                 sample_two.astype(np.float64)),
+                           rtol=1e-4, atol=1e-6):
+            raise ValueError('{} lost precision for float32 inputs far from the '
+                             'origin'.format(kernel))
+
+
+def test_eval_pairs_integer_inputs():
+    """Integer inputs must be evaluated in float64, without any overflow."""
+
+    # enough features to compute distances via inner products
+    X = np.random.randint(0, 100, (6, 50))
+    for dtype in (np.uint8, np.int16):
+        X_int = X.astype(dtype)
+        for kernel in (GaussianKernel(sigma=50), LaplacianKernel(gamma=0.001),
+                       PolyKernel(b=0.5), LinearKernel()):
+            expected = kernel.eval_pairs(X.astype(np.float64), X.astype(np.float64))
+            km = KernelMatrix(kernel, normalized=False)
+            km.attach_to(X_int)
+            for result in (kernel.eval_pairs(X_int, X_int),
+                           kernel.eval_pairs(X_int, X_int[:4]), km.full):
+                if result.dtype != np.float64:
+                    raise TypeError('{} evaluated {} inputs in {}'
+                                    ''.format(kernel, dtype, result.dtype))
+                if not np.allclose(result, expected[:, :result.shape[1]]):
+                    raise ValueError('{} differs for {} inputs'
+                                     ''.format(kernel, dtype))
+
+
+def test_eval_pairs_parallel():
+    """Parallel evaluation over blocks of rows must match the serial one."""
+
+    X = gen_random_sample(50, default_feature_dim)
+    Y = gen_random_sample(30, default_feature_dim)
+
+    for kernel in DEFINED_KERNEL_FUNCS:
+        for n_jobs in (None, 1, 3):
+            if not np.allclose(kernel.eval_pairs_parallel(X, Y, n_jobs=n_jobs),
+                               kernel.eval_pairs(X, Y)):
+                raise ValueError('{} differs between parallel and serial '
+                                 'evaluation with n_jobs={}'.format(kernel, n_jobs))
+
+
+def test_numba_matches_numpy(monkeypatch):
+    """Compiled kernels must match the numpy versions used without numba."""
+
+    importorskip('numba')
+
+    X = gen_random_sample(20, default_feature_dim)
+    Y = gen_random_sample(15, default_feature_dim)
+
+    for kernel in (GaussianKernel(), LaplacianKernel()):
+        for sample_one, sample_two in ((X, Y), (X, X)):
+            compiled_km = kernel.eval_pairs(sample_one, sample_two)
+            compiled_pairwise = np.array([[kernel(x, y) for y in sample_two]
+                                          for x in sample_one])
+            with monkeypatch.context() as patch:
+                patch.setattr(numeric_kernels, 'numba', None)
+                numpy_km = kernel.eval_pairs(sample_one, sample_two)
+            if not np.allclose(compiled_km, numpy_km) or \
+                not np.allclose(compiled_pairwise, numpy_km):
+                raise ValueError('{} differs with and without numba'.format(kernel))
+
+
+def test_numexpr_matches_numpy(monkeypatch):
+    """Kernels fused via numexpr must match their numpy versions."""
+
+    importorskip('numexpr')
+
+    for dtype in (np.float64, np.float32):
+        X = gen_random_sample(20, 50).astype(dtype)
+        Y = gen_random_sample(15, 50).astype(dtype)
+        for kernel in (GaussianKernel(), SigmoidKernel(gamma=0.1)):
+            for sample_one, sample_two in ((X, Y), (X, X)):
+                fused_km = kernel.eval_pairs(sample_one, sample_two)
+                with monkeypatch.context() as patch:
+                    patch.setattr(numeric_kernels, 'numexpr', None)
+                    numpy_km = kernel.eval_pairs(sample_one, sample_two)
+                if fused_km.dtype != numpy_km.dtype:
+                    raise TypeError('{} returned {} with numexpr, and {} without'
+                                    ''.format(kernel, fused_km.dtype,
+                                              numpy_km.dtype))
+                if not np.allclose(fused_km, numpy_km, rtol=1e-5, atol=1e-6):
+                    raise ValueError('{} differs with and without numexpr'
+                                     ''.format(kernel))
@@ -38,6 +38,71 @@ def check_input_arrays(x, y, ensure_dtype=np.number):
     return x, y
 
 
+def check_input_matrices(X, Y, ensure_dtype=np.number):
+    """
+    Ensures the inputs are
+    1) 2D arrays (samples in rows, features in columns)
+    2) with the same number of features (columns)
+    3) of a particular data type
+    and hence are safe to operate on in a batch (all pairs of rows).
+
+    Sparse matrices are retained as such (in CSR format), to allow kernels to
+    exploit the sparsity of their inputs.
+
+    Parameters
+    ----------
+    X : iterable
+
+    Y : iterable
+
+    ensure_dtype : dtype
+
+    Returns
+    -------
+    X : ndarray
+
+    Y : ndarray
+
+    """
+
+    # preserving the identity of Y when it refers to X (single sample case)
+    same_sample = Y is X
+
+    X = _ensure_2D_maybe_sparse(X, ensure_dtype)
+    if same_sample:
+        Y = X
+    else:
+        Y = _ensure_2D_maybe_sparse(Y, ensure_dtype, ensure_num_cols=X.shape[1])
+
+    return X, Y
+
+
+def _ensure_2D_maybe_sparse(array, ensure_dtype=np.number, ensure_num_cols=None):
+    """Same as ensure_ndarray_2D, except sparse matrices are converted to CSR."""
+
+    if not issparse(array):
+        array = np.asarray(array)
+        # retaining a floating point dtype (e.g. float32), when it already meets
+        #   the requirement. Integers are recast, as they can overflow in kernels
+        if np.issubdtype(array.dtype, np.floating) and \
+            np.issubdtype(array.dtype, ensure_dtype):
+            ensure_dtype = array.dtype
+        return ensure_ndarray_2D(array, ensure_dtype, ensure_num_cols)
+
+    if not np.issubdtype(array.dtype, ensure_dtype):
+        raise ValueError('Sparse matrix dtype {} is not {}!'
+                         ''.format(array.dtype, ensure_dtype))
+
+    if not np.issubdtype(array.dtype, np.floating):
+        array = array.astype(np.float64)
+
+    if ensure_num_cols is not None and array.shape[1] != ensure_num_cols:
+        raise ValueError('The number of columns differ from expected {}'
+                         ''.format(ensure_num_cols))
+
+    return array.tocsr()
+
+
 def ensure_ndarray_2D(array, ensure_dtype=np.number, ensure_num_cols=None):
     """Converts the input to a numpy array and ensure it is 1D."""
 
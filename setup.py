@@ -15,6 +15,10 @@ with open('HISTORY.rst') as history_file:
 requirements = ['scipy',
                 'numpy']
 
+# optional, for compiled (parallel) evaluation of some numeric kernels, and
+#   joblib for eval_pairs_parallel()
+extras_requirements = {'fast': ['numba', 'numexpr', 'joblib']}
+
 setup_requirements = ['pytest-runner', ]
 
 test_requirements = ['pytest', ] + requirements
@@ -37,6 +41,7 @@ setup(name='kernelmethods',
     ],
     description="kernel methods and classes",
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="Apache Software License 2.0",
     long_description=readme + '\n\n' + history,
     include_package_data=True,